@@ -16,6 +16,12 @@ SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_hex(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 30
 MAGIC_LINK_EXPIRE_MINUTES = 15
+# Comma-separated emails allowed to use admin endpoints
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.getenv("ADMIN_EMAILS", "").split(",")
+    if email.strip()
+}
 
 security = HTTPBearer()
 
@@ -67,9 +73,26 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Routes task queries to the household's shard when sharding is enabled
+    db.info["household_id"] = user.household_id
     return user
 
 
+def is_admin(user: User) -> bool:
+    """Check whether a user is listed in ADMIN_EMAILS."""
+    return user.email.lower() in ADMIN_EMAILS
+
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Dependency to get the current user, who must be an admin."""
+    if not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    return current_user
+
+
 def get_magic_link_expiry() -> datetime:
     """Get the expiry time for a magic link."""
     return datetime.utcnow() + timedelta(minutes=MAGIC_LINK_EXPIRE_MINUTES)
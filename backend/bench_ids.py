@@ -0,0 +1,97 @@
+"""Compare primary-key storage: String(36) uuid4 ids vs compact GUID uuid7 ids.
+
+Creates two scratch tables, inserts the same number of rows into each and
+reports insert throughput plus primary key index size.
+
+    python bench_ids.py                      # temporary SQLite file
+    DATABASE_URL=postgresql://... python bench_ids.py --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from typing import Callable
+
+from sqlalchemy import Column, MetaData, String, Table, Text, create_engine, text
+
+from models import GUID, uuid7
+
+
+def build_tables(metadata: MetaData) -> dict[str, tuple[Table, Callable[[], str]]]:
+    legacy = Table(
+        "bench_ids_string", metadata,
+        Column("id", String(36), primary_key=True),
+        Column("title", Text, nullable=False),
+    )
+    compact = Table(
+        "bench_ids_guid", metadata,
+        Column("id", GUID(), primary_key=True),
+        Column("title", Text, nullable=False),
+    )
+    return {
+        "String(36) + uuid4": (legacy, lambda: str(uuid.uuid4())),
+        "GUID + uuid7": (compact, lambda: str(uuid7())),
+    }
+
+
+def index_size(conn, table: Table) -> int | None:
+    if conn.dialect.name == "postgresql":
+        return conn.execute(
+            text("SELECT pg_relation_size(:name)"), {"name": f"{table.name}_pkey"}
+        ).scalar()
+    try:
+        return conn.execute(
+            text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"),
+            {"name": f"sqlite_autoindex_{table.name}_1"},
+        ).scalar()
+    except Exception:
+        return None  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+
+
+def run(url: str, rows: int, batch: int):
+    engine = create_engine(url)
+    metadata = MetaData()
+    tables = build_tables(metadata)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    try:
+        for label, (table, make_id) in tables.items():
+            start = time.perf_counter()
+            for offset in range(0, rows, batch):
+                values = [
+                    {"id": make_id(), "title": f"task {offset + i}"}
+                    for i in range(min(batch, rows - offset))
+                ]
+                with engine.begin() as conn:
+                    conn.execute(table.insert(), values)
+            elapsed = time.perf_counter() - start
+
+            with engine.connect() as conn:
+                size = index_size(conn, table)
+            size_text = f"{size / 1024:.0f} KiB" if size is not None else "n/a"
+            print(f"{label:<20} {rows / elapsed:>10.0f} rows/s   pk index {size_text}")
+    finally:
+        metadata.drop_all(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--batch", type=int, default=1_000)
+    args = parser.parse_args()
+
+    url = os.getenv("DATABASE_URL")
+    if url:
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        run(url, args.rows, args.batch)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.rows, args.batch)
+
+
+if __name__ == "__main__":
+    main()
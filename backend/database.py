@@ -1,27 +1,337 @@
+import bisect
+import hashlib
+import hmac
+import itertools
+import math
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import secrets
+import time
+from typing import Optional
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./shared_tasks.db")
+from fastapi import Request, Response
+from sqlalchemy import Column, MetaData, Table, create_engine, event, inspect, make_url, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql import Select
 
-# Handle Render's postgres:// vs postgresql:// URL format
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# SQLite needs special connect_args
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args = {"check_same_thread": False}
+def normalize_url(url: str) -> str:
+    # Handle Render's postgres:// vs postgresql:// URL format
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def make_engine(url: str):
+    # SQLite needs special connect_args
+    connect_args = {}
+    if url.startswith("sqlite"):
+        connect_args = {"check_same_thread": False}
+    return create_engine(url, connect_args=connect_args)
+
+
+DATABASE_URL = normalize_url(os.getenv("DATABASE_URL", "sqlite:///./shared_tasks.db"))
+
+# Optional comma-separated read replicas of DATABASE_URL
+DATABASE_REPLICA_URLS = [
+    normalize_url(url.strip())
+    for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+
+# After a client writes, its reads stay on the primary for this long so it
+# never sees a replica that has not caught up yet. Tracked in a signed cookie,
+# so it works across workers and instances that share SECRET_KEY.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+READ_YOUR_WRITES_SECRET = os.getenv("SECRET_KEY", secrets.token_hex(32))
+
+READ_ONLY_METHODS = {"GET", "HEAD"}
+
+# Optional comma-separated shard databases. When set, DATABASE_URL only holds
+# the global directory (users, households) and each household's tasks live on
+# the shard the hash ring assigns it to.
+DATABASE_SHARD_URLS = [
+    normalize_url(url.strip())
+    for url in os.getenv("DATABASE_SHARD_URLS", "").split(",")
+    if url.strip()
+]
+
+# How often each process re-reads ring membership and pins from the directory.
+SHARD_RING_REFRESH_SECONDS = float(os.getenv("SHARD_RING_REFRESH_SECONDS", "5"))
+
+engine = make_engine(DATABASE_URL)
+replica_engines = [make_engine(url) for url in DATABASE_REPLICA_URLS]
+
+
+def shard_key(url: str) -> str:
+    """Stable ring name for a shard: its URL without the password."""
+    return make_url(url).render_as_string(hide_password=True)
+
+
+class HashRing:
+    """Consistent-hash ring mapping household ids to shard keys."""
+
+    VNODES = 64
+
+    def __init__(self, nodes):
+        self.nodes = sorted(set(nodes))
+        points = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(self.VNODES)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def get(self, key: str) -> str:
+        if not self._hashes:
+            raise RuntimeError("Shard ring is empty")
+        index = bisect.bisect(self._hashes, self._hash(str(key))) % len(self._hashes)
+        return self._owners[index]
+
+
+class HouseholdMoving(Exception):
+    """Raised on a write to a household that shard_migrate.py has frozen."""
+
+
+class ShardRouter:
+    """Resolves the shard engine that holds a household's data.
+
+    Ring membership and per-household pins live in the directory database, so
+    shard_migrate.py can move households while the app keeps serving them.
+    Both are cached and re-read every ``refresh_seconds``; pins only exist
+    while a migration runs, so the cache stays small.
+    """
+
+    def __init__(self, directory, shard_urls, refresh_seconds: float):
+        self.directory = directory
+        self.engines = {shard_key(url): make_engine(url) for url in shard_urls}
+        self.refresh_seconds = refresh_seconds
+        self._ring = None
+        self._pins: dict[str, tuple[str, bool]] = {}
+        self._loaded_at = 0.0
+
+    def load_ring(self) -> HashRing:
+        members = Base.metadata.tables["shard_ring"]
+        with self.directory.connect() as conn:
+            nodes = conn.execute(select(members.c.shard)).scalars().all()
+        unknown = set(nodes) - set(self.engines)
+        if unknown:
+            raise RuntimeError(f"Shards on the ring but not in DATABASE_SHARD_URLS: {sorted(unknown)}")
+        return HashRing(nodes)
+
+    def load_pins(self) -> dict[str, tuple[str, bool]]:
+        pins = Base.metadata.tables["household_shard_pins"]
+        with self.directory.connect() as conn:
+            rows = conn.execute(select(pins.c.household_id, pins.c.shard, pins.c.frozen))
+            return {household_id: (shard, frozen) for household_id, shard, frozen in rows}
+
+    def _refresh(self):
+        if self._ring is None or time.monotonic() - self._loaded_at >= self.refresh_seconds:
+            self._ring = self.load_ring()
+            self._pins = self.load_pins()
+            self._loaded_at = time.monotonic()
+
+    def placement(self, household_id: str) -> tuple[str, bool]:
+        """Return the household's shard key and whether it is frozen for a move."""
+        self._refresh()
+        pinned = self._pins.get(household_id)
+        if pinned:
+            return pinned
+        return self._ring.get(household_id), False
+
+    def initialize(self):
+        """Create shard tables and seed ring membership on first start."""
+        for shard_engine in self.engines.values():
+            create_shard_tables(shard_engine)
+        members = Base.metadata.tables["shard_ring"]
+        with self.directory.begin() as conn:
+            if conn.execute(select(members.c.shard).limit(1)).first() is None:
+                # Several processes may start on an empty ring at once
+                insert_missing(conn, members, [{"shard": key} for key in self.engines])
+
+
+def insert_missing(conn, table, rows: list[dict]):
+    """INSERT rows, skipping any whose primary key already exists."""
+    if not rows:
+        return
+    if conn.dialect.name == "postgresql":
+        conn.execute(postgresql.insert(table).on_conflict_do_nothing(), rows)
+    elif conn.dialect.name == "sqlite":
+        conn.execute(sqlite.insert(table).on_conflict_do_nothing(), rows)
+    else:
+        for row in rows:
+            try:
+                with conn.begin_nested():
+                    conn.execute(table.insert(), row)
+            except IntegrityError:
+                pass
+
+
+def create_shard_tables(shard_engine):
+    """Create the sharded tables on a shard, minus foreign keys into the directory."""
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        if table.info.get("sharded"):
+            Table(table.name, metadata, *[
+                Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable)
+                for c in table.columns
+            ])
+    metadata.create_all(shard_engine)
+
+
+class ReadYourWrites:
+    """Signed cookie telling every process to read from the primary until a deadline.
+
+    The deadline travels with the client, so it holds across workers and
+    instances; the signature stops clients from pinning themselves to the
+    primary indefinitely. It relies on server clocks being roughly in sync.
+    """
+
+    COOKIE = "read_primary_until"
+
+    def __init__(self, window_seconds: float, secret: str = READ_YOUR_WRITES_SECRET):
+        self.window_seconds = window_seconds
+        self._secret = secret.encode()
+
+    def _sign(self, until: str) -> str:
+        return hmac.new(self._secret, until.encode(), hashlib.sha256).hexdigest()
+
+    def cookie_value(self) -> str:
+        until = f"{time.time() + self.window_seconds:.3f}"
+        return f"{until}.{self._sign(until)}"
+
+    def is_sticky(self, value: Optional[str]) -> bool:
+        if not value:
+            return False
+        until, _, signature = value.rpartition(".")
+        if not hmac.compare_digest(signature, self._sign(until)):
+            return False
+        try:
+            return float(until) > time.time()
+        except ValueError:
+            return False
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica and everything else to the primary.
+
+    A session only reads from a replica when ``info["read_only"]`` is set and
+    the client has not written recently (``info["read_primary"]``). The replica is picked
+    round-robin once per session so all of a request's reads see the same data.
+
+    With a shard router, mappers whose table is marked ``sharded`` go to the
+    shard of the household in ``info["household_id"]`` instead, and writes
+    raise HouseholdMoving while that household is frozen.
+    """
+
+    _counter = itertools.count()
+
+    def __init__(self, *args, primary=None, replicas=(), sticky=None, shards=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.sticky = sticky
+        self.shards = shards
+
+    def _shard_bind(self, mapper, clause):
+        if self.shards is None or mapper is None:
+            return None
+        if not inspect(mapper).local_table.info.get("sharded"):
+            return None
+        household_id = self.info.get("household_id")
+        if household_id is None:
+            return None
+        if "shard" not in self.info:
+            key, frozen = self.shards.placement(household_id)
+            self.info["shard"] = self.shards.engines[key]
+            self.info["shard_frozen"] = frozen
+        if self.info["shard_frozen"] and (
+            self._flushing or (clause is not None and not isinstance(clause, Select))
+        ):
+            raise HouseholdMoving(household_id)
+        return self.info["shard"]
+
+    def _use_replica(self, clause) -> bool:
+        if not self.replicas or self._flushing:
+            return False
+        if not self.info.get("read_only"):
+            return False
+        if clause is not None and not isinstance(clause, Select):
+            return False
+        return not self.info.get("read_primary")
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        shard = self._shard_bind(mapper, clause)
+        if shard is not None:
+            return shard
+        if not self._use_replica(clause):
+            if self.primary is None:
+                return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+            return self.primary
+        if "replica" not in self.info:
+            index = next(self._counter) % len(self.replicas)
+            self.info["replica"] = self.replicas[index]
+        return self.info["replica"]
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_sticky_window(session):
+    response = session.info.get("response")
+    if session.info.pop("wrote", False) and response is not None and session.sticky:
+        response.set_cookie(
+            ReadYourWrites.COOKIE,
+            session.sticky.cookie_value(),
+            max_age=max(1, math.ceil(session.sticky.window_seconds)),
+            httponly=True,
+            samesite="lax",
+        )
+
+
+read_your_writes = ReadYourWrites(REPLICA_STICKY_SECONDS)
+
+shard_router = (
+    ShardRouter(engine, DATABASE_SHARD_URLS, SHARD_RING_REFRESH_SECONDS)
+    if DATABASE_SHARD_URLS else None
+)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    primary=engine,
+    replicas=replica_engines,
+    sticky=read_your_writes,
+    shards=shard_router,
+)
 
 Base = declarative_base()
 
 
-def get_db():
-    """Dependency to get database session."""
+def get_db(request: Request, response: Response):
+    """Dependency to get database session.
+
+    GET/HEAD requests may be served from a read replica when
+    DATABASE_REPLICA_URLS is configured, unless the client wrote within the
+    last REPLICA_STICKY_SECONDS. With DATABASE_SHARD_URLS, task
+    queries go to the current user's household shard once get_current_user
+    has identified them.
+    """
     db = SessionLocal()
+    db.info["read_only"] = request.method in READ_ONLY_METHODS
+    db.info["response"] = response
+    if db.sticky:
+        db.info["read_primary"] = db.sticky.is_sticky(request.cookies.get(ReadYourWrites.COOKIE))
     try:
         yield db
     finally:
@@ -1,31 +1,36 @@
 import os
+import uuid
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 
-from database import engine, get_db, Base
+from database import engine, get_db, Base, shard_router, HouseholdMoving
 from models import User, Household, Task
 from schemas import (
     MagicLinkRequest, MagicLinkVerify, TokenResponse,
     UserResponse, UserUpdate, UserBrief,
     HouseholdCreate, HouseholdJoin, HouseholdResponse,
     TaskCreate, TaskUpdate, TaskResponse,
+    ProfileSummary,
 )
 from auth import (
     create_access_token, create_magic_token, get_magic_link_expiry,
-    get_current_user,
+    get_current_user, get_admin_user,
 )
+from profiling import ProfilingMiddleware, profile_store, to_collapsed, to_speedscope
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Create tables on startup
     Base.metadata.create_all(bind=engine)
+    if shard_router:
+        shard_router.initialize()
     yield
 
 
@@ -46,6 +51,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in request profiling (X-Profile header from an admin, or sampling)
+app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+
+@app.exception_handler(HouseholdMoving)
+async def household_moving_handler(request, exc):
+    # The household is read-only for a few seconds while it moves shards
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Household is being moved, try again shortly"},
+        headers={"Retry-After": "5"},
+    )
+
 
 # ============== Auth Routes ==============
 
@@ -319,7 +337,7 @@ async def create_task(
 
 @app.post("/api/tasks/{task_id}/claim", response_model=TaskResponse, tags=["Tasks"])
 async def claim_task(
-    task_id: str,
+    task_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -341,7 +359,7 @@ async def claim_task(
 
 @app.post("/api/tasks/{task_id}/unclaim", response_model=TaskResponse, tags=["Tasks"])
 async def unclaim_task(
-    task_id: str,
+    task_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -363,7 +381,7 @@ async def unclaim_task(
 
 @app.post("/api/tasks/{task_id}/complete", response_model=TaskResponse, tags=["Tasks"])
 async def complete_task(
-    task_id: str,
+    task_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -386,7 +404,7 @@ async def complete_task(
 
 @app.post("/api/tasks/{task_id}/uncomplete", response_model=TaskResponse, tags=["Tasks"])
 async def uncomplete_task(
-    task_id: str,
+    task_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -409,7 +427,7 @@ async def uncomplete_task(
 
 @app.delete("/api/tasks/{task_id}", tags=["Tasks"])
 async def delete_task(
-    task_id: str,
+    task_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -428,6 +446,32 @@ async def delete_task(
     return {"message": "Task deleted"}
 
 
+# ============== Admin Routes ==============
+
+@app.get("/api/admin/profiles", response_model=list[ProfileSummary], tags=["Admin"])
+async def list_profiles(admin: User = Depends(get_admin_user)):
+    """List the most recent request profiles, newest first."""
+    return profile_store.list()
+
+
+@app.get("/api/admin/profiles/{profile_id}", tags=["Admin"])
+async def get_profile(
+    profile_id: int,
+    format: str = "speedscope",
+    admin: User = Depends(get_admin_user),
+):
+    """Export a profile as speedscope JSON or collapsed stacks (format=collapsed)."""
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "collapsed":
+        return PlainTextResponse(to_collapsed(profile))
+    if format != "speedscope":
+        raise HTTPException(status_code=400, detail="Unknown format")
+    return to_speedscope(profile)
+
+
 # ============== Static Files (Frontend) ==============
 
 # Check multiple possible locations for frontend dist
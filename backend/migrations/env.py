@@ -0,0 +1,51 @@
+from alembic import context
+from sqlalchemy import create_engine
+
+from database import engine, Base, shard_router
+import models  # noqa: F401  (registers tables on Base.metadata)
+
+target_metadata = Base.metadata
+
+# alembic -x url=... (or sqlalchemy.url in the config) overrides DATABASE_URL
+url = context.get_x_argument(as_dictionary=True).get("url") or context.config.get_main_option("sqlalchemy.url")
+if url:
+    engine = create_engine(url)
+    shard_router = None
+
+
+def run_migrations_offline():
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_on(target_engine, shard: bool):
+    # Each database keeps its own alembic_version. Migrations check
+    # context.config.attributes["shard"] to touch only the tables that live there.
+    context.config.attributes["shard"] = shard
+    with target_engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+def run_migrations_online():
+    run_migrations_on(engine, shard=False)
+    if shard_router:
+        for shard_engine in shard_router.engines.values():
+            run_migrations_on(shard_engine, shard=True)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
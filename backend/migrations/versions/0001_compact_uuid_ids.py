@@ -0,0 +1,133 @@
+"""Store ids as native UUID (Postgres) / 16-byte binary (SQLite)
+
+Converts the String(36) primary keys on users, households and tasks, and the
+foreign keys that point at them, to the compact GUID column type. Databases
+created fresh by ``Base.metadata.create_all`` already have the new types, and
+an empty database gets them from create_all on startup, so the upgrade is a
+no-op for both.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+import uuid
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (table, column) for every id column, primary keys first.
+ID_COLUMNS = [
+    ("households", "id"),
+    ("users", "id"),
+    ("tasks", "id"),
+    ("users", "household_id"),
+    ("tasks", "household_id"),
+    ("tasks", "claimed_by"),
+    ("tasks", "completed_by"),
+    ("tasks", "created_by"),
+]
+
+FOREIGN_KEY_TABLES = ["users", "tasks"]
+
+
+def _ids_are_strings(bind) -> bool:
+    inspector = sa.inspect(bind)
+    if "households" not in inspector.get_table_names():
+        return False  # fresh database: create_all builds GUID columns on startup
+    columns = inspector.get_columns("households")
+    id_type = next(c["type"] for c in columns if c["name"] == "id")
+    return isinstance(id_type, sa.String)
+
+
+def _drop_foreign_keys(bind) -> list[tuple[str, dict]]:
+    inspector = sa.inspect(bind)
+    dropped = []
+    for table in FOREIGN_KEY_TABLES:
+        for fk in inspector.get_foreign_keys(table):
+            op.drop_constraint(fk["name"], table, type_="foreignkey")
+            dropped.append((table, fk))
+    return dropped
+
+
+def _create_foreign_keys(dropped: list[tuple[str, dict]]):
+    for table, fk in dropped:
+        op.create_foreign_key(
+            fk["name"], table, fk["referred_table"],
+            fk["constrained_columns"], fk["referred_columns"],
+        )
+
+
+def _convert_sqlite_values(bind, from_type: str, convert):
+    for table, column in ID_COLUMNS:
+        rows = bind.execute(sa.text(
+            f"SELECT DISTINCT {column} FROM {table} WHERE typeof({column}) = :t"
+        ), {"t": from_type}).fetchall()
+        for (old,) in rows:
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :new WHERE {column} = :old"),
+                {"new": convert(old), "old": old},
+            )
+
+
+def upgrade():
+    # Shards are created with GUID columns; nothing to convert there
+    if context.config.attributes.get("shard"):
+        return
+    bind = op.get_bind()
+    if not _ids_are_strings(bind):
+        return
+
+    if bind.dialect.name == "postgresql":
+        dropped = _drop_foreign_keys(bind)
+        for table, column in ID_COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=postgresql.UUID(as_uuid=True),
+                postgresql_using=f"{column}::uuid",
+            )
+        _create_foreign_keys(dropped)
+        return
+
+    # Convert before changing the type: the batch copy CASTs every value to
+    # BLOB, which would turn the 36-char text into a 36-byte blob.
+    _convert_sqlite_values(bind, "text", lambda v: uuid.UUID(v).bytes)
+    for table in ("households", "users", "tasks"):
+        with op.batch_alter_table(table) as batch:
+            for t, column in ID_COLUMNS:
+                if t == table:
+                    batch.alter_column(column, type_=sa.LargeBinary(16))
+
+
+def downgrade():
+    # Shards are created with GUID columns; nothing to convert there
+    if context.config.attributes.get("shard"):
+        return
+    bind = op.get_bind()
+    if "households" not in sa.inspect(bind).get_table_names() or _ids_are_strings(bind):
+        return
+
+    if bind.dialect.name == "postgresql":
+        dropped = _drop_foreign_keys(bind)
+        for table, column in ID_COLUMNS:
+            op.alter_column(
+                table, column,
+                type_=sa.String(36),
+                postgresql_using=f"{column}::text",
+            )
+        _create_foreign_keys(dropped)
+        return
+
+    _convert_sqlite_values(bind, "blob", lambda v: str(uuid.UUID(bytes=bytes(v))))
+    for table in ("households", "users", "tasks"):
+        with op.batch_alter_table(table) as batch:
+            for t, column in ID_COLUMNS:
+                if t == table:
+                    batch.alter_column(column, type_=sa.String(36))
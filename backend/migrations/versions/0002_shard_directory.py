@@ -0,0 +1,48 @@
+"""Add shard ring membership and household pin tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+from models import GUID
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Directory-only tables
+    if context.config.attributes.get("shard"):
+        return
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "households" not in existing:
+        return  # fresh database: create_all builds every table on startup
+    if "shard_ring" not in existing:
+        op.create_table(
+            "shard_ring",
+            sa.Column("shard", sa.String(255), primary_key=True),
+        )
+    if "household_shard_pins" not in existing:
+        op.create_table(
+            "household_shard_pins",
+            sa.Column("household_id", GUID(), sa.ForeignKey("households.id"), primary_key=True),
+            sa.Column("shard", sa.String(255), nullable=False),
+            sa.Column("frozen", sa.Boolean(), nullable=False, server_default=sa.false()),
+        )
+
+
+def downgrade():
+    # Directory-only tables
+    if context.config.attributes.get("shard"):
+        return
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "household_shard_pins" in existing:
+        op.drop_table("household_shard_pins")
+    if "shard_ring" in existing:
+        op.drop_table("shard_ring")
@@ -0,0 +1,59 @@
+"""Record shard moves so shard_migrate.py can resume or abort them
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+PIN_COLUMNS = [
+    sa.Column("source", sa.String(255), nullable=False, server_default=""),
+    sa.Column("target", sa.String(255), nullable=False, server_default=""),
+    sa.Column("merge", sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column("moved", sa.Boolean(), nullable=False, server_default=sa.false()),
+]
+
+
+def upgrade():
+    # Directory-only tables
+    if context.config.attributes.get("shard"):
+        return
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    if "households" not in existing:
+        return  # fresh database: create_all builds every table on startup
+    if "shard_moves" not in existing:
+        op.create_table(
+            "shard_moves",
+            sa.Column("shard", sa.String(255), primary_key=True),
+            sa.Column("action", sa.String(10), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=False),
+        )
+    pin_columns = {c["name"] for c in inspector.get_columns("household_shard_pins")}
+    with op.batch_alter_table("household_shard_pins") as batch:
+        for column in PIN_COLUMNS:
+            if column.name not in pin_columns:
+                batch.add_column(column.copy())
+
+
+def downgrade():
+    # Directory-only tables
+    if context.config.attributes.get("shard"):
+        return
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    if "shard_moves" in existing:
+        op.drop_table("shard_moves")
+    if "household_shard_pins" in existing:
+        pin_columns = {c["name"] for c in inspector.get_columns("household_shard_pins")}
+        with op.batch_alter_table("household_shard_pins") as batch:
+            for column in PIN_COLUMNS:
+                if column.name in pin_columns:
+                    batch.drop_column(column.name)
@@ -1,12 +1,64 @@
+import os
+import time
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Boolean, Column, String, DateTime, ForeignKey, Text, LargeBinary
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from database import Base
 
 
+class GUID(TypeDecorator):
+    """UUID column stored compactly: native UUID on Postgres, 16 raw bytes elsewhere.
+
+    Values go in as either a UUID or its string form and always come back as
+    the canonical string, so the API keeps seeing plain string ids.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        if dialect.name == "postgresql":
+            return value
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
+def uuid7() -> uuid.UUID:
+    """Time-ordered UUID (RFC 9562 version 7).
+
+    48-bit millisecond timestamp followed by random bits, so new ids sort after
+    existing ones and inserts append to the end of the primary key index.
+    """
+    unix_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (unix_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76  # version
+    value |= (rand >> 68) << 64  # rand_a (12 bits)
+    value |= 0b10 << 62  # variant
+    value |= rand & 0x3FFF_FFFF_FFFF_FFFF  # rand_b (62 bits)
+    return uuid.UUID(int=value)
+
+
 def generate_uuid():
-    return str(uuid.uuid4())
+    return str(uuid7())
 
 
 def generate_invite_code():
@@ -16,7 +68,7 @@ def generate_invite_code():
 class Household(Base):
     __tablename__ = "households"
 
-    id = Column(String(36), primary_key=True, default=generate_uuid)
+    id = Column(GUID(), primary_key=True, default=generate_uuid)
     name = Column(String(255), nullable=False)
     invite_code = Column(String(6), unique=True, nullable=False, default=generate_invite_code)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -29,11 +81,11 @@ class Household(Base):
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(String(36), primary_key=True, default=generate_uuid)
+    id = Column(GUID(), primary_key=True, default=generate_uuid)
     email = Column(String(255), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=True)
     avatar_color = Column(String(7), default="#f97316")
-    household_id = Column(String(36), ForeignKey("households.id"), nullable=True)
+    household_id = Column(GUID(), ForeignKey("households.id"), nullable=True)
     magic_token = Column(String(255), nullable=True, index=True)
     magic_token_expires = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -47,14 +99,16 @@ class User(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Lives on the household's shard when DATABASE_SHARD_URLS is set
+    __table_args__ = {"info": {"sharded": True}}
 
-    id = Column(String(36), primary_key=True, default=generate_uuid)
-    household_id = Column(String(36), ForeignKey("households.id"), nullable=False)
+    id = Column(GUID(), primary_key=True, default=generate_uuid)
+    household_id = Column(GUID(), ForeignKey("households.id"), nullable=False)
     title = Column(Text, nullable=False)
-    claimed_by = Column(String(36), ForeignKey("users.id"), nullable=True)
-    completed_by = Column(String(36), ForeignKey("users.id"), nullable=True)
+    claimed_by = Column(GUID(), ForeignKey("users.id"), nullable=True)
+    completed_by = Column(GUID(), ForeignKey("users.id"), nullable=True)
     completed_at = Column(DateTime, nullable=True)
-    created_by = Column(String(36), ForeignKey("users.id"), nullable=False)
+    created_by = Column(GUID(), ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
@@ -62,3 +116,36 @@ class Task(Base):
     created_by_user = relationship("User", back_populates="tasks_created", foreign_keys=[created_by])
     claimed_by_user = relationship("User", back_populates="tasks_claimed", foreign_keys=[claimed_by])
     completed_by_user = relationship("User", back_populates="tasks_completed", foreign_keys=[completed_by])
+
+
+class ShardRingMember(Base):
+    """A shard on the consistent-hash ring (sharded deployments only)."""
+    __tablename__ = "shard_ring"
+
+    shard = Column(String(255), primary_key=True)
+
+
+class ShardMove(Base):
+    """The ring change shard_migrate.py is carrying out, so it can resume or abort."""
+    __tablename__ = "shard_moves"
+
+    shard = Column(String(255), primary_key=True)
+    action = Column(String(10), nullable=False)  # "add", or "remove" while aborting one
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class HouseholdShardPin(Base):
+    """Overrides ring placement for a household while shard_migrate.py moves it."""
+    __tablename__ = "household_shard_pins"
+
+    household_id = Column(GUID(), ForeignKey("households.id"), primary_key=True)
+    # Where requests go until the pin is dropped
+    shard = Column(String(255), nullable=False)
+    source = Column(String(255), nullable=False)
+    target = Column(String(255), nullable=False)
+    # Keep rows already on the target instead of replacing them
+    merge = Column(Boolean, nullable=False, default=False)
+    # Writes are rejected while the household's tasks are being copied
+    frozen = Column(Boolean, nullable=False, default=False)
+    # Copied and cut over; only the source rows are left to delete
+    moved = Column(Boolean, nullable=False, default=False)
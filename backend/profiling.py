@@ -0,0 +1,254 @@
+"""Opt-in per-request profiling.
+
+A request is profiled when an admin sends the ``X-Profile`` header or when it
+falls into the PROFILING_SAMPLE_PERCENT random sample. A background thread
+samples the stack of the thread serving the request, and the result is kept in
+a bounded in-memory buffer that the admin endpoints export as collapsed stacks
+or speedscope JSON. Requests that are not profiled only pay for a header scan.
+
+The sampler thread needs the GIL, so while the request thread runs Python code
+samples arrive about every ``sys.getswitchinterval()`` whatever interval is
+asked for. Each sample is therefore weighted by the wall time since the
+previous one rather than by the nominal interval.
+"""
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from auth import is_admin, verify_token
+from database import SessionLocal
+from models import User
+
+PROFILING_SAMPLE_PERCENT = float(os.getenv("PROFILING_SAMPLE_PERCENT", "0"))
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "20"))
+PROFILING_INTERVAL_MS = float(
+    os.getenv("PROFILING_INTERVAL_MS", str(sys.getswitchinterval() * 1000))
+)
+
+PROFILE_HEADER = b"x-profile"
+PROFILES_PATH = "/api/admin/profiles"
+
+# (function name, file, first line)
+Frame = tuple[str, str, int]
+
+
+@dataclass
+class Profile:
+    id: int
+    method: str
+    path: str
+    started_at: datetime
+    duration_ms: float
+    sample_count: int
+    status_code: Optional[int] = None
+    # stack -> milliseconds spent in it
+    samples: Counter = field(default_factory=Counter)
+
+
+class ProfileStore:
+    """Ring buffer holding the most recent profiles."""
+
+    def __init__(self, max_profiles: int):
+        self._profiles: deque[Profile] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: Profile):
+        self._profiles.append(profile)
+
+    def list(self) -> list[Profile]:
+        return list(reversed(self._profiles))
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        return next((p for p in self._profiles if p.id == profile_id), None)
+
+
+class StackSampler:
+    """Samples one thread's Python stack, weighting each sample by elapsed time."""
+
+    def __init__(self, thread_id: int, interval_ms: float):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is not None:
+                self.samples[self._stack(frame)] += (now - last) * 1000
+                self.sample_count += 1
+            last = now
+
+    @staticmethod
+    def _stack(frame) -> tuple[Frame, ...]:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def to_collapsed(profile: Profile) -> str:
+    """Brendan Gregg's collapsed-stack format, one ``a;b;c weight`` line per stack.
+
+    Weights are integer microseconds.
+    """
+    lines = [
+        ";".join(_frame_label(f) for f in stack) + f" {round(ms * 1000)}"
+        for stack, ms in profile.samples.most_common()
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(profile: Profile) -> dict:
+    """Sampled profile in speedscope's file format."""
+    frame_index: dict[Frame, int] = {}
+    samples = []
+    weights = []
+    for stack, ms in profile.samples.items():
+        samples.append([frame_index.setdefault(f, len(frame_index)) for f in stack])
+        weights.append(ms)
+    name = f"{profile.method} {profile.path} #{profile.id}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "shared-tasks",
+        "shared": {
+            "frames": [
+                {"name": n, "file": filename, "line": line}
+                for n, filename, line in frame_index
+            ],
+        },
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def _is_admin_token(authorization: bytes) -> bool:
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    user_id = verify_token(token)
+    if user_id is None:
+        return False
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        return user is not None and is_admin(user)
+    finally:
+        db.close()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles admin-requested or sampled requests.
+
+    Only one request is profiled at a time. The sampler watches the thread
+    the request runs on, so other requests sharing the event loop during the
+    same window show up in the profile too.
+    """
+
+    def __init__(self, app, store: ProfileStore,
+                 sample_percent: float = PROFILING_SAMPLE_PERCENT,
+                 interval_ms: float = PROFILING_INTERVAL_MS):
+        self.app = app
+        self.store = store
+        self.sample_percent = sample_percent
+        self.interval_ms = interval_ms
+        self._busy = threading.Lock()
+
+    def _should_profile(self, scope) -> tuple[bool, Optional[bytes]]:
+        """Return (profile?, authorization to check for an admin header request)."""
+        if scope["type"] != "http" or scope["path"].startswith(PROFILES_PATH):
+            return False, None
+        headers = dict(scope["headers"])
+        if PROFILE_HEADER in headers:
+            return True, headers.get(b"authorization", b"")
+        sampled = self.sample_percent > 0 and random.random() * 100 < self.sample_percent
+        return sampled, None
+
+    async def __call__(self, scope, receive, send):
+        wanted, authorization = self._should_profile(scope)
+        if not wanted or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        try:
+            # The admin lookup hits the database, so keep it off the event loop
+            if authorization is not None and not await run_in_threadpool(_is_admin_token, authorization):
+                self._busy.release()
+                await self.app(scope, receive, send)
+                return
+        except BaseException:
+            self._busy.release()
+            raise
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._busy.release()
+
+    async def _profile(self, scope, receive, send):
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        sampler = StackSampler(threading.get_ident(), self.interval_ms)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            self.store.add(Profile(
+                id=self.store.next_id(),
+                method=scope["method"],
+                path=scope["path"],
+                started_at=started_at,
+                duration_ms=(time.perf_counter() - start) * 1000,
+                sample_count=sampler.sample_count,
+                status_code=status_code,
+                samples=sampler.samples,
+            ))
+
+
+profile_store = ProfileStore(PROFILING_MAX_PROFILES)
@@ -101,3 +101,18 @@ class TaskResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# --- Admin Schemas ---
+
+class ProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    status_code: Optional[int] = None
+    started_at: datetime
+    duration_ms: float
+    sample_count: int
+
+    class Config:
+        from_attributes = True
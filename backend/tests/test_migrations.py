@@ -0,0 +1,96 @@
+import os
+import uuid
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from database import Base
+from models import Household, Task, User
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Schema as create_all built it before ids became GUID columns
+LEGACY_SCHEMA = [
+    """CREATE TABLE households (
+        id VARCHAR(36) PRIMARY KEY, name VARCHAR(255) NOT NULL,
+        invite_code VARCHAR(6) NOT NULL UNIQUE, created_at DATETIME NOT NULL)""",
+    """CREATE TABLE users (
+        id VARCHAR(36) PRIMARY KEY, email VARCHAR(255) NOT NULL UNIQUE,
+        name VARCHAR(255), avatar_color VARCHAR(7),
+        household_id VARCHAR(36) REFERENCES households (id),
+        magic_token VARCHAR(255), magic_token_expires DATETIME,
+        created_at DATETIME NOT NULL)""",
+    """CREATE TABLE tasks (
+        id VARCHAR(36) PRIMARY KEY,
+        household_id VARCHAR(36) NOT NULL REFERENCES households (id),
+        title TEXT NOT NULL,
+        claimed_by VARCHAR(36) REFERENCES users (id),
+        completed_by VARCHAR(36) REFERENCES users (id),
+        completed_at DATETIME,
+        created_by VARCHAR(36) NOT NULL REFERENCES users (id),
+        created_at DATETIME NOT NULL)""",
+]
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_uuid_migration_round_trip_on_sqlite(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(url)
+    household_id, user_id, task_id = (str(uuid.uuid4()) for _ in range(3))
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        conn.execute(text(
+            "INSERT INTO households VALUES (:id, 'Home', 'ABC123', '2026-01-01 00:00:00')"
+        ), {"id": household_id})
+        conn.execute(text(
+            "INSERT INTO users VALUES (:id, 'a@example.com', 'A', '#f97316', :hid,"
+            " NULL, NULL, '2026-01-01 00:00:00')"
+        ), {"id": user_id, "hid": household_id})
+        conn.execute(text(
+            "INSERT INTO tasks VALUES (:id, :hid, 'Dishes', :uid, NULL, NULL, :uid,"
+            " '2026-01-01 00:00:00')"
+        ), {"id": task_id, "hid": household_id, "uid": user_id})
+
+    config = alembic_config(url)
+    command.upgrade(config, "0001")
+
+    with engine.connect() as conn:
+        for table, column in [("households", "id"), ("users", "household_id"), ("tasks", "claimed_by")]:
+            kind, size = conn.execute(text(f"SELECT typeof({column}), length({column}) FROM {table}")).one()
+            assert (kind, size) == ("blob", 16)
+
+    with Session(engine) as db:
+        task = db.query(Task).filter(Task.id == task_id).one()
+        assert task.household_id == household_id
+        assert task.claimed_by_user.id == user_id
+        assert db.get(User, user_id).household.id == household_id
+        assert [m.id for m in db.get(Household, household_id).members] == [user_id]
+
+    command.downgrade(config, "base")
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id, typeof(id) FROM tasks")).one() == (task_id, "text")
+        assert conn.execute(text("SELECT created_by FROM tasks")).scalar() == user_id
+        assert conn.execute(text("SELECT household_id FROM users")).scalar() == household_id
+
+
+def test_upgrade_on_empty_database_leaves_schema_to_create_all(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fresh.db'}"
+    command.upgrade(alembic_config(url), "head")
+
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        household = Household(name="Home")
+        db.add(household)
+        db.commit()
+        assert db.get(Household, household.id).name == "Home"
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import profiling
+from profiling import ProfileStore, ProfilingMiddleware, StackSampler, to_collapsed, to_speedscope
+
+
+def busy(ms: float):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+async def busy_app(scope, receive, send):
+    busy(60)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def request(middleware, headers=()):
+    scope = {"type": "http", "method": "GET", "path": "/api/tasks", "headers": list(headers)}
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    asyncio.run(middleware(scope, receive, send))
+
+
+def test_sample_weights_add_up_to_wall_time():
+    sampler = StackSampler(threading.get_ident(), interval_ms=1)
+    sampler.start()
+    busy(200)
+    sampler.stop()
+    assert 150 < sum(sampler.samples.values()) <= 210
+
+
+def test_admin_header_profiles_the_request(monkeypatch):
+    lookup_threads = []
+
+    def is_admin_token(authorization):
+        lookup_threads.append(threading.get_ident())
+        return authorization == b"Bearer admin"
+
+    monkeypatch.setattr(profiling, "_is_admin_token", is_admin_token)
+    store = ProfileStore(max_profiles=2)
+    middleware = ProfilingMiddleware(busy_app, store, sample_percent=0)
+
+    request(middleware, [(b"x-profile", b"1"), (b"authorization", b"Bearer someone")])
+    assert store.list() == []
+
+    request(middleware, [(b"x-profile", b"1"), (b"authorization", b"Bearer admin")])
+    [profile] = store.list()
+    assert profile.status_code == 200
+    assert 0.7 * profile.duration_ms < to_speedscope(profile)["profiles"][0]["endValue"] <= profile.duration_ms
+    assert "busy (test_profiling.py" in to_collapsed(profile)
+    assert threading.get_ident() not in lookup_threads
+
+
+def test_header_is_not_checked_while_another_request_is_profiled(monkeypatch):
+    calls = []
+    monkeypatch.setattr(profiling, "_is_admin_token", lambda authorization: calls.append(authorization))
+    store = ProfileStore(max_profiles=2)
+    middleware = ProfilingMiddleware(busy_app, store, sample_percent=0)
+
+    middleware._busy.acquire()
+    request(middleware, [(b"x-profile", b"1"), (b"authorization", b"Bearer admin")])
+    assert calls == []
+    assert store.list() == []
+
+
+def test_ring_buffer_keeps_most_recent_profiles():
+    store = ProfileStore(max_profiles=2)
+    middleware = ProfilingMiddleware(busy_app, store, sample_percent=100)
+    for _ in range(3):
+        request(middleware)
+    assert [p.id for p in store.list()] == [3, 2]
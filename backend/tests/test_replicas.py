@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base, ReadYourWrites, RoutingSession
+from main import app
+
+
+@pytest.fixture
+def start_worker(tmp_path, monkeypatch):
+    """Route the app through a fresh "process" sharing one primary and one replica.
+
+    The replica never receives any writes, so a read that reaches it cannot see
+    anything written during the test.
+    """
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(primary)
+    Base.metadata.create_all(replica)
+
+    def start(sticky_seconds: float = 5, secret: str = "shared-secret"):
+        monkeypatch.setattr(database, "SessionLocal", sessionmaker(
+            class_=RoutingSession,
+            autoflush=False,
+            primary=primary,
+            replicas=[replica],
+            sticky=ReadYourWrites(sticky_seconds, secret=secret),
+        ))
+
+    return start
+
+
+def sign_in(client: TestClient) -> dict:
+    token = client.post("/api/auth/magic-link", json={"email": "a@example.com"}).json()["token"]
+    response = client.post("/api/auth/verify", json={"token": token})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_reads_after_sign_in_stay_on_primary(start_worker):
+    start_worker()
+    client = TestClient(app)
+    response = client.get("/api/users/me", headers=sign_in(client))
+    assert response.status_code == 200
+    assert response.json()["email"] == "a@example.com"
+
+
+def test_sticky_window_holds_across_workers(start_worker):
+    start_worker()
+    client = TestClient(app)
+    headers = sign_in(client)
+
+    # The next read is served by another process with no shared memory
+    start_worker()
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+
+def test_reads_go_to_replica_outside_sticky_window(start_worker):
+    start_worker(sticky_seconds=0)
+    client = TestClient(app)
+    response = client.get("/api/users/me", headers=sign_in(client))
+    assert response.status_code == 401
+
+
+def test_unsigned_sticky_cookie_is_ignored(start_worker):
+    start_worker()
+    client = TestClient(app)
+    headers = sign_in(client)
+
+    start_worker(secret="another-secret")
+    assert client.get("/api/users/me", headers=headers).status_code == 401
+    client.cookies.set(ReadYourWrites.COOKIE, "9999999999.000.forged")
+    assert client.get("/api/users/me", headers=headers).status_code == 401
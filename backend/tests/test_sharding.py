@@ -0,0 +1,281 @@
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, inspect, select
+from sqlalchemy.orm import sessionmaker
+
+import database
+from database import Base, HashRing, ReadYourWrites, RoutingSession, ShardRouter, shard_key
+from main import app
+from models import HouseholdShardPin, ShardMove, ShardRingMember, Task
+import shard_migrate
+from shard_migrate import Migration, abort, add_shard, resume
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cluster(tmp_path, monkeypatch):
+    """A directory database plus three SQLite shards, the first two on the ring."""
+    directory = create_engine(f"sqlite:///{tmp_path / 'directory.db'}")
+    Base.metadata.create_all(directory)
+    urls = [f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(3)]
+    router = ShardRouter(directory, urls, refresh_seconds=0)
+    with directory.begin() as conn:
+        conn.execute(ShardRingMember.__table__.insert(), [{"shard": shard_key(u)} for u in urls[:2]])
+    router.initialize()
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(
+        class_=RoutingSession,
+        autoflush=False,
+        primary=directory,
+        sticky=ReadYourWrites(5),
+        shards=router,
+    ))
+    return router, urls
+
+
+def sign_up_household(client: TestClient, email: str) -> tuple[dict, str]:
+    token = client.post("/api/auth/magic-link", json={"email": email}).json()["token"]
+    access = client.post("/api/auth/verify", json={"token": token}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {access}"}
+    household = client.post("/api/households", json={"name": email}, headers=headers).json()
+    return headers, household["id"]
+
+
+def task_count(shard_engine, household_id=None) -> int:
+    query = select(func.count()).select_from(Task.__table__)
+    if household_id:
+        query = query.where(Task.__table__.c.household_id == household_id)
+    with shard_engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+
+def test_tasks_live_on_the_household_shard(cluster):
+    router, _ = cluster
+    client = TestClient(app)
+    households = []
+    for i in range(6):
+        headers, household_id = sign_up_household(client, f"user{i}@example.com")
+        assert client.post("/api/tasks", json={"title": "Dishes"}, headers=headers).status_code == 200
+        assert [t["title"] for t in client.get("/api/tasks", headers=headers).json()] == ["Dishes"]
+        households.append(household_id)
+
+    ring = router.load_ring()
+    for household_id in households:
+        for key, shard_engine in router.engines.items():
+            expected = 1 if key == ring.get(household_id) else 0
+            assert task_count(shard_engine, household_id) == expected
+    assert task_count(router.directory) == 0
+
+
+def test_frozen_household_is_read_only(cluster):
+    router, _ = cluster
+    client = TestClient(app)
+    headers, household_id = sign_up_household(client, "a@example.com")
+    client.post("/api/tasks", json={"title": "Dishes"}, headers=headers)
+
+    with router.directory.begin() as conn:
+        shard = router.load_ring().get(household_id)
+        conn.execute(HouseholdShardPin.__table__.insert(), {
+            "household_id": household_id,
+            "shard": shard,
+            "source": shard,
+            "target": shard,
+            "frozen": True,
+        })
+
+    assert client.get("/api/tasks", headers=headers).status_code == 200
+    response = client.post("/api/tasks", json={"title": "Laundry"}, headers=headers)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+def test_pins_are_cached_with_the_ring(cluster):
+    router, _ = cluster
+    router.refresh_seconds = 60
+    router.placement("00000000-0000-7000-8000-000000000000")
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(router.directory, "before_cursor_execute", record)
+    try:
+        router.placement("00000000-0000-7000-8000-000000000001")
+    finally:
+        event.remove(router.directory, "before_cursor_execute", record)
+    assert statements == []
+
+
+def test_add_shard_moves_households_without_losing_tasks(cluster):
+    router, urls = cluster
+    client = TestClient(app)
+    households = {}
+    for i in range(12):
+        headers, household_id = sign_up_household(client, f"user{i}@example.com")
+        for title in ("Dishes", "Laundry"):
+            client.post("/api/tasks", json={"title": title}, headers=headers)
+        households[household_id] = headers
+
+    add_shard(router, urls[2], grace_seconds=0, batch_size=5)
+
+    ring = router.load_ring()
+    new_key = shard_key(urls[2])
+    assert new_key in ring.nodes
+    assert router.load_pins() == {}
+    moved = [hid for hid in households if ring.get(hid) == new_key]
+    assert moved
+    for household_id, headers in households.items():
+        for key, shard_engine in router.engines.items():
+            expected = 2 if key == ring.get(household_id) else 0
+            assert task_count(shard_engine, household_id) == expected
+        titles = sorted(t["title"] for t in client.get("/api/tasks", headers=headers).json())
+        assert titles == ["Dishes", "Laundry"]
+
+
+def test_concurrent_initialize_does_not_conflict(cluster):
+    router, urls = cluster
+    with router.directory.begin() as conn:
+        conn.execute(ShardRingMember.__table__.delete())
+        # Another process seeded the ring between our emptiness check and insert
+        database.insert_missing(conn, ShardRingMember.__table__, [{"shard": shard_key(urls[0])}])
+        database.insert_missing(conn, ShardRingMember.__table__, [{"shard": shard_key(u)} for u in urls])
+    assert router.load_ring().nodes == sorted(shard_key(u) for u in urls)
+
+
+def test_alembic_runs_on_every_shard(cluster, monkeypatch):
+    router, _ = cluster
+    monkeypatch.setattr(database, "shard_router", router)
+    monkeypatch.setattr(database, "engine", router.directory)
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+
+    for shard_engine in [router.directory, *router.engines.values()]:
+        assert "alembic_version" in inspect(shard_engine).get_table_names()
+    assert "households" not in inspect(next(iter(router.engines.values()))).get_table_names()
+
+
+def test_hash_ring_only_moves_keys_to_new_node():
+    old = HashRing(["a", "b", "c"])
+    new = HashRing(["a", "b", "c", "d"])
+    keys = [f"household-{i}" for i in range(2000)]
+    moved = [k for k in keys if old.get(k) != new.get(k)]
+    assert all(new.get(k) == "d" for k in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.4
+
+
+def test_writes_during_a_move_are_kept_or_rejected(cluster, monkeypatch):
+    router, urls = cluster
+    client = TestClient(app)
+    new_key = shard_key(urls[2])
+    new_ring = HashRing(router.load_ring().nodes + [new_key])
+    for i in range(50):
+        headers, household_id = sign_up_household(client, f"user{i}@example.com")
+        if new_ring.get(household_id) == new_key:
+            break
+    task_ids = [
+        client.post("/api/tasks", json={"title": f"Task {n}"}, headers=headers).json()["id"]
+        for n in range(4)
+    ]
+
+    # Each routing wait in the tool is a window where the household keeps
+    # getting traffic: complete one more task per window.
+    statuses = []
+
+    def write_during_wait(seconds):
+        task_id = task_ids[len(statuses)]
+        statuses.append(client.post(f"/api/tasks/{task_id}/complete", headers=headers).status_code)
+
+    monkeypatch.setattr("shard_migrate.time.sleep", write_during_wait)
+    add_shard(router, urls[2], grace_seconds=0, batch_size=10)
+
+    # pinned, ring grown, frozen, cut over
+    assert statuses == [200, 200, 503, 200]
+    completed = {t["id"] for t in client.get("/api/tasks/completed", headers=headers).json()}
+    assert completed == {task_ids[0], task_ids[1], task_ids[3]}
+    assert task_count(router.engines[new_key], household_id) == 4
+
+
+def interrupt(monkeypatch, point: str):
+    """Make the next add_shard crash at the given point."""
+    if point == "before ring":
+        def wait_for_routers(self):
+            raise RuntimeError("interrupted")
+        monkeypatch.setattr(Migration, "wait_for_routers", wait_for_routers)
+    else:
+        # The first batch of two is moved, the second dies mid-copy while frozen
+        real_sync = shard_migrate.sync_tasks
+        calls = []
+
+        def sync_tasks(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 3:
+                raise RuntimeError("interrupted")
+            return real_sync(*args, **kwargs)
+        monkeypatch.setattr(shard_migrate, "sync_tasks", sync_tasks)
+
+
+@pytest.fixture
+def interrupted_add(cluster, monkeypatch):
+    router, urls = cluster
+    client = TestClient(app)
+    households = {}
+    for i in range(30):
+        headers, household_id = sign_up_household(client, f"user{i}@example.com")
+        for title in ("Dishes", "Laundry"):
+            client.post("/api/tasks", json={"title": title}, headers=headers)
+        households[household_id] = headers
+
+    def run(point: str):
+        with monkeypatch.context() as patch:
+            interrupt(patch, point)
+            with pytest.raises(RuntimeError):
+                add_shard(router, urls[2], grace_seconds=0, batch_size=2)
+        return client, households
+
+    return run
+
+
+def assert_settled(router, client, households):
+    """Every household has both tasks on its ring shard and accepts writes."""
+    ring = router.load_ring()
+    assert router.load_pins() == {}
+    with router.directory.connect() as conn:
+        assert conn.execute(select(ShardMove.__table__)).first() is None
+    for household_id, headers in households.items():
+        for key, shard_engine in router.engines.items():
+            expected = 2 if key == ring.get(household_id) else 0
+            assert task_count(shard_engine, household_id) == expected
+        assert client.post("/api/tasks", json={"title": "New"}, headers=headers).status_code == 200
+
+
+def test_interrupted_add_leaves_households_frozen(interrupted_add, cluster):
+    router, _ = cluster
+    client, households = interrupted_add("copy")
+    frozen = [hid for hid, (_, is_frozen) in router.load_pins().items() if is_frozen]
+    assert frozen
+    response = client.post("/api/tasks", json={"title": "New"}, headers=households[frozen[0]])
+    assert response.status_code == 503
+
+
+@pytest.mark.parametrize("point", ["before ring", "copy"])
+def test_resume_finishes_interrupted_add(interrupted_add, cluster, point):
+    router, urls = cluster
+    client, households = interrupted_add(point)
+    resume(router, grace_seconds=0, batch_size=2)
+    assert shard_key(urls[2]) in router.load_ring().nodes
+    assert_settled(router, client, households)
+
+
+@pytest.mark.parametrize("point", ["before ring", "copy"])
+def test_abort_restores_the_old_ring(interrupted_add, cluster, point):
+    router, urls = cluster
+    client, households = interrupted_add(point)
+    abort(router, grace_seconds=0, batch_size=2)
+    assert shard_key(urls[2]) not in router.load_ring().nodes
+    assert task_count(router.engines[shard_key(urls[2])]) == 0
+    assert_settled(router, client, households)